@@ -542,6 +542,10 @@ CREATE INDEX IF NOT EXISTS idx_nodes_updated_at ON nodes(updated_at DESC);
 CREATE INDEX IF NOT EXISTS idx_chats_created_at ON chats(created_at DESC);
 SQL
 
+echo "Ensuring heartbeat access paths exist..."
+bash "$(dirname "$0")/../migrate/add_heartbeat_indexes.sh" "$DB_PATH"
+bash "$(dirname "$0")/../migrate/add_person_last_interaction.sh" "$DB_PATH"
+
 echo "Running VACUUM and ANALYZE..."
 "$SQLITE_BIN" "$DB_PATH" "VACUUM; ANALYZE;"
 
@@ -18,8 +18,21 @@ Modes:
 Usage:
   python scripts/heartbeat.py --mode morning
   python scripts/heartbeat.py --mode morning --dry-run
+  python scripts/heartbeat.py --mode card-proposals --limit 0
+  python scripts/heartbeat.py --mode morning --notify-backend stdout --notify-window 0
+  python scripts/heartbeat.py --profile-startup
+
+Rules in ~/.config/pkm/heartbeat_rules.json (--rules) add nudges without
+code: each names the modes (ticks) it runs on, and all rules due at a tick
+are evaluated by one batched query after the mode itself.
+
+Notifications are queued in the state store and sent by a short-lived
+detached dispatcher, so modes firing within --notify-window seconds of each
+other produce one digest.
 
 Deploy with launchd (not cron) — see scripts/heartbeat-setup.md
+Requires the schema from scripts/migrate/add_heartbeat_indexes.sh and
+scripts/migrate/add_person_last_interaction.sh.
 
 Exit codes:
   0  OK
@@ -28,91 +41,387 @@ Exit codes:
 
 from __future__ import annotations
 
-import argparse
-import json
-import logging
-import sqlite3
-import subprocess
-import sys
-from datetime import datetime, timedelta
-from pathlib import Path
+import time
+
+STARTED = time.perf_counter()  # --profile-startup measures imports from here
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
+import sqlite3  # noqa: E402
+import sys  # noqa: E402
+from contextlib import closing  # noqa: E402
+from datetime import date, datetime, timedelta, timezone  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+import pkm5_db  # noqa: E402
+
+# subprocess is imported where notifications are sent: it is the heaviest
+# stdlib import here and most ticks never need it.
 
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
 
-PKM5_DB = Path.home() / "Library" / "Application Support" / "PKM5" / "db" / "pkm5.sqlite"
-STATE_FILE = Path.home() / ".config" / "pkm" / "heartbeat_state.json"
+PKM5_DB = pkm5_db.DB_PATH  # $SQLITE_DB_PATH or the app's default location
+STATE_DB = Path.home() / ".config" / "pkm" / "heartbeat_state.sqlite"
 LOG_FILE = Path.home() / ".config" / "pkm" / "heartbeat.log"
-
-LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler(sys.stdout),
-    ],
+RULES_FILE = Path(os.environ.get(
+    "PKM_HEARTBEAT_RULES", Path.home() / ".config" / "pkm" / "heartbeat_rules.json"
+))
+
+PROPOSAL_TITLE_PREFIX = "PROPOSAL: Update card for "
+REVIEW_TITLE_MARKER = "Review —"  # in every review title: "Weekly Review — …"
+CARD_PROPOSAL_LIMIT = 20  # default cards per card-proposals run; --limit 0 for all
+SLOW_QUERY_MS = 250.0     # query()/scalar()/notify() calls slower than this are logged; --slow-ms
+NOTIFY_WINDOW_S = 10.0    # notifications queued within this window are coalesced; --notify-window
+NOTIFY_BACKEND = os.environ.get(
+    "PKM_HEARTBEAT_NOTIFY", "osascript" if sys.platform == "darwin" else "stdout"
 )
+
 logger = logging.getLogger(__name__)
 
 
+def setup_logging() -> None:
+    """Log to LOG_FILE and stdout. Called from main(), not at import, so
+    importing heartbeat (e.g. from heartbeat_bench.py) has no side effects."""
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.FileHandler(LOG_FILE),
+            logging.StreamHandler(sys.stdout),
+        ],
+    )
+
+
 # ---------------------------------------------------------------------------
 # SQLite helpers
 # ---------------------------------------------------------------------------
 
-def db() -> sqlite3.Connection:
-    con = sqlite3.connect(PKM5_DB)
-    con.row_factory = sqlite3.Row
-    return con
+# One entry per query()/scalar()/notify() call in this run, for the per-mode
+# timing summary: {"kind", "label", "ms", "lock_wait_ms", "rows"}
+TIMINGS: list[dict] = []
 
 
-def query(sql: str, params: tuple = ()) -> list[sqlite3.Row]:
-    with db() as con:
-        return con.execute(sql, params).fetchall()
+def record_timing(kind: str, label: str, started: float, lock_wait: float = 0.0, rows: int | None = None) -> None:
+    ms = (time.perf_counter() - started) * 1000
+    TIMINGS.append({"kind": kind, "label": label, "ms": ms, "lock_wait_ms": lock_wait * 1000, "rows": rows})
+    if ms >= SLOW_QUERY_MS:
+        detail = f", lock wait {lock_wait * 1000:.0f} ms, {rows} rows" if kind == "query" else ""
+        logger.warning(f"Slow {kind}: {label} took {ms:.0f} ms{detail}")
 
 
-def scalar(sql: str, params: tuple = ()) -> int | str | None:
-    with db() as con:
-        row = con.execute(sql, params).fetchone()
-        return row[0] if row else None
+def timing_summary() -> str:
+    queries = [t for t in TIMINGS if t["kind"] == "query"]
+    notifications = [t for t in TIMINGS if t["kind"] == "notify"]
+    summary = (
+        f"{len(queries)} quer{'y' if len(queries) == 1 else 'ies'} "
+        f"{sum(t['ms'] for t in queries):.0f} ms "
+        f"(lock wait {sum(t['lock_wait_ms'] for t in queries):.0f} ms)"
+    )
+    if queries:
+        slowest = max(queries, key=lambda t: t["ms"])
+        summary += f", slowest {slowest['label']} {slowest['ms']:.0f} ms"
+    queued = sum(1 for t in TIMINGS if t["kind"] == "enqueue")
+    if queued:
+        summary += f" · {queued} notification(s) queued"
+    if notifications:
+        summary += f" · {len(notifications)} sent {sum(t['ms'] for t in notifications):.0f} ms"
+    return summary
+
+
+# Reads use pooled read-only connections with busy_timeout=0: lock waits are
+# retried (and measured) in pkm5_db.execute() instead of being hidden inside
+# SQLite's busy handler. label names the query in timings and slow-query logs.
+
+def query(sql: str, params: tuple | dict = (), *, label: str) -> list[sqlite3.Row]:
+    started = time.perf_counter()
+    with pkm5_db.connection(PKM5_DB, busy_timeout=0) as con:
+        cur, lock_wait = pkm5_db.execute(con, sql, params)
+        rows = cur.fetchall()
+    record_timing("query", label, started, lock_wait, len(rows))
+    return rows
+
+
+def scalar(sql: str, params: tuple = (), *, label: str) -> int | str | None:
+    started = time.perf_counter()
+    with pkm5_db.connection(PKM5_DB, busy_timeout=0) as con:
+        cur, lock_wait = pkm5_db.execute(con, sql, params)
+        row = cur.fetchone()
+    record_timing("query", label, started, lock_wait, 1 if row else 0)
+    return row[0] if row else None
 
 
 # ---------------------------------------------------------------------------
 # State / rate limiting
 # ---------------------------------------------------------------------------
 
-def load_state() -> dict:
-    if STATE_FILE.exists():
-        try:
-            return json.loads(STATE_FILE.read_text())
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+_state_ready: set[Path] = set()  # state stores set up (schema, eviction) in this process
+
+
+def state_db() -> sqlite3.Connection:
+    """Open the state store (key/value with expiry, plus the outbox); the
+    first call per process creates the schema and evicts expired keys."""
+    if STATE_DB in _state_ready:
+        return sqlite3.connect(STATE_DB, timeout=10, isolation_level=None)
+    STATE_DB.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(STATE_DB, timeout=10, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL
+        )
+    """)
+    con.execute(
+        "CREATE INDEX IF NOT EXISTS idx_state_expires ON state(expires_at)"
+        " WHERE expires_at IS NOT NULL"
+    )
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY,
+            created_at REAL NOT NULL,
+            backend TEXT NOT NULL,
+            message TEXT NOT NULL,
+            subtitle TEXT NOT NULL DEFAULT '',
+            urgent INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    con.execute("DELETE FROM state WHERE expires_at <= ?", (time.time(),))
+    _state_ready.add(STATE_DB)
+    return con
+
 
+def state_get(key: str):
+    """Return the JSON-decoded value for key, or None if missing/expired."""
+    with closing(state_db()) as con:
+        row = con.execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+    return json.loads(row[0]) if row else None
 
-def save_state(state: dict) -> None:
-    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    STATE_FILE.write_text(json.dumps(state, indent=2, default=str))
+
+def state_set(key: str, value, ttl_hours: float | None = None) -> None:
+    expires_at = time.time() + ttl_hours * 3600 if ttl_hours is not None else None
+    with closing(state_db()) as con:
+        con.execute(
+            "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, default=str), expires_at),
+        )
+
+
+def claim(keys: list[str], ttl_hours: float) -> set[str]:
+    """Atomically claim keys not already held for ttl_hours; return the ones claimed."""
+    now = time.time()
+    claimed: set[str] = set()
+    with closing(state_db()) as con:
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for key in keys:
+                held = con.execute(
+                    "SELECT 1 FROM state WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if held:
+                    continue
+                con.execute(
+                    "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(datetime.now().isoformat()), now + ttl_hours * 3600),
+                )
+                claimed.add(key)
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+    return claimed
+
+
+def db_fingerprint() -> list[int]:
+    """Cheap change marker: mtime/size of the database and its WAL file (stat only)."""
+    fingerprint: list[int] = []
+    for path in (PKM5_DB, PKM5_DB.with_name(PKM5_DB.name + "-wal")):
+        try:
+            st = path.stat()
+            fingerprint += [st.st_mtime_ns, st.st_size]
+        except FileNotFoundError:
+            fingerprint += [0, 0]
+    return fingerprint
+
+
+def cached_query(key: str, fn) -> list[dict]:
+    """Return fn() results, or the cached copy under key if the database
+    fingerprint and the UTC day (date('now') rolls over) are unchanged."""
+    fingerprint = db_fingerprint()
+    today = datetime.utcnow().date().isoformat()
+    cache = state_get(key) or {}
+    if cache.get("fingerprint") == fingerprint and cache.get("date") == today:
+        logger.info("Database unchanged since last tick — reusing cached results")
+        return cache["rows"]
+    rows = fn()
+    state_set(key, {"fingerprint": fingerprint, "date": today, "rows": rows}, ttl_hours=24)
+    return rows
 
 
 # ---------------------------------------------------------------------------
 # Notification
 # ---------------------------------------------------------------------------
 
+class OsascriptBackend:
+    """macOS Notification Center via osascript."""
+
+    def send(self, message: str, subtitle: str = "", urgent: bool = False) -> None:
+        import subprocess
+
+        sound = "Basso" if urgent else "Glass"
+        safe_msg = message.replace('"', '\\"')
+        safe_sub = subtitle.replace('"', '\\"')
+        sub_clause = f' subtitle "{safe_sub}"' if safe_sub else ""
+        script = (
+            f'display notification "{safe_msg}" with title "PKM Heartbeat"'
+            f'{sub_clause} sound name "{sound}"'
+        )
+        subprocess.run(["osascript", "-e", script], check=True, capture_output=True)
+
+
+class FileBackend:
+    """Append one JSON line per notification to a file (or stdout if path is
+    None) — for headless runs and testing off macOS."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+
+    def send(self, message: str, subtitle: str = "", urgent: bool = False) -> None:
+        line = json.dumps({
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "message": message,
+            "subtitle": subtitle,
+            "urgent": urgent,
+        }, ensure_ascii=False)
+        if self.path is None:
+            print(line, flush=True)
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a") as f:
+            f.write(line + "\n")
+
+
+# Backend spec is "name" or "name:arg" (e.g. "file:~/pkm-notifications.jsonl");
+# register new backends here.
+BACKENDS = {
+    "osascript": lambda arg: OsascriptBackend(),
+    "stdout": lambda arg: FileBackend(None),
+    "file": lambda arg: FileBackend(Path(arg).expanduser()),
+}
+
+
+def notification_backend(spec: str):
+    name, _, arg = spec.partition(":")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown notification backend {spec!r} (known: {', '.join(BACKENDS)})")
+    return BACKENDS[name](arg)
+
+
 def notify(message: str, subtitle: str = "", urgent: bool = False) -> None:
-    sound = "Basso" if urgent else "Glass"
-    safe_msg = message.replace('"', '\\"')
-    safe_sub = subtitle.replace('"', '\\"')
-    sub_clause = f' subtitle "{safe_sub}"' if safe_sub else ""
-    script = (
-        f'display notification "{safe_msg}" with title "PKM Heartbeat"'
-        f'{sub_clause} sound name "{sound}"'
+    """Queue a notification in the outbox; dispatch_notifications() sends it."""
+    started = time.perf_counter()
+    with closing(state_db()) as con:
+        con.execute(
+            "INSERT INTO outbox (created_at, backend, message, subtitle, urgent) VALUES (?, ?, ?, ?, ?)",
+            (time.time(), NOTIFY_BACKEND, message, subtitle, int(urgent)),
+        )
+    record_timing("enqueue", "outbox", started)
+
+
+def coalesce(items: list[tuple[str, str, int]]) -> tuple[str, str, bool]:
+    """Merge queued (message, subtitle, urgent) rows into one notification."""
+    if len(items) == 1:
+        message, subtitle, urgent = items[0]
+        return message, subtitle, bool(urgent)
+    messages = list(dict.fromkeys(m for m, _, _ in items))
+    return "\n".join(messages), f"{len(messages)} updates", any(u for _, _, u in items)
+
+
+# Which outbox rows a flush sends. stdout rows are always sent inline: the
+# detached dispatcher's stdout is /dev/null.
+OUTBOX_SCOPES = {
+    "all": "1",
+    "stdout": "backend = 'stdout'",
+    "dispatcher": "backend != 'stdout'",
+}
+
+
+def flush_outbox(scope: str = "all", release_dispatcher: bool = False) -> int:
+    """Send queued rows in scope, one coalesced notification per backend,
+    deleting rows only once sent; return the number sent."""
+    where = OUTBOX_SCOPES[scope]
+    last_id = 0
+    sent = 0
+    while True:
+        with closing(state_db()) as con:
+            con.execute("BEGIN IMMEDIATE")
+            rows = con.execute(
+                f"SELECT id, backend, message, subtitle, urgent FROM outbox"
+                f" WHERE id > ? AND {where} ORDER BY id",
+                (last_id,),
+            ).fetchall()
+            if not rows and release_dispatcher:
+                con.execute("DELETE FROM state WHERE key = 'notify_dispatcher'")
+            con.execute("COMMIT")
+        if not rows:
+            return sent
+        last_id = rows[-1][0]
+
+        grouped: dict[str, list[tuple[int, str, str, int]]] = {}
+        for row_id, backend, message, subtitle, urgent in rows:
+            grouped.setdefault(backend, []).append((row_id, message, subtitle, urgent))
+
+        for spec, items in grouped.items():
+            message, subtitle, urgent = coalesce([item[1:] for item in items])
+            started = time.perf_counter()
+            try:
+                notification_backend(spec).send(message, subtitle=subtitle, urgent=urgent)
+            except Exception as e:
+                logger.error(f"Notification failed ({spec}), {len(items)} kept queued: {e}")
+                continue
+            finally:
+                record_timing("notify", spec, started)
+            with closing(state_db()) as con:
+                con.executemany("DELETE FROM outbox WHERE id = ?", [(item[0],) for item in items])
+            sent += 1
+            if len(items) > 1:
+                logger.info(f"Coalesced {len(items)} notifications via {spec}")
+
+
+def dispatch_notifications() -> None:
+    """Send queued notifications without blocking this run: inline, or via
+    one detached dispatcher per burst that coalesces NOTIFY_WINDOW_S."""
+    with closing(state_db()) as con:
+        backends = {b for (b,) in con.execute("SELECT DISTINCT backend FROM outbox")}
+    if NOTIFY_WINDOW_S <= 0:
+        if backends:
+            flush_outbox()
+        return
+    if "stdout" in backends:
+        flush_outbox("stdout")
+        backends.discard("stdout")
+    if not backends:
+        return
+    if not claim(["notify_dispatcher"], ttl_hours=(NOTIFY_WINDOW_S + 60) / 3600):
+        return  # a dispatcher is already waiting and will pick these up
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--dispatch",
+         "--notify-window", str(NOTIFY_WINDOW_S)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
     )
-    try:
-        subprocess.run(["osascript", "-e", script], check=True, capture_output=True)
-    except Exception as e:
-        logger.error(f"Notification failed: {e}")
 
 
 # ---------------------------------------------------------------------------
@@ -120,35 +429,38 @@ def notify(message: str, subtitle: str = "", urgent: bool = False) -> None:
 # ---------------------------------------------------------------------------
 
 def tasks_due_today() -> list[dict]:
+    # Drive from the pending set via idx_dim_by_dimension (CROSS JOIN pins
+    # the join order): it stays bounded by open work, whereas past-due
+    # meta_due values accumulate forever as tasks get completed. Task
+    # membership and dims are primary-key lookups on node_dimensions.
     rows = query("""
-        SELECT n.id, n.title,
-               json_extract(n.metadata, '$.due') AS due,
-               GROUP_CONCAT(nd.dimension, '|') AS dims
-        FROM nodes n
-        JOIN node_dimensions nd ON nd.node_id = n.id
-        WHERE n.id IN (SELECT node_id FROM node_dimensions WHERE dimension = 'task')
-          AND n.id IN (SELECT node_id FROM node_dimensions WHERE dimension = 'pending')
-          AND json_extract(n.metadata, '$.due') = date('now')
-        GROUP BY n.id
-    """)
+        SELECT n.id, n.title, n.meta_due AS due,
+               (SELECT GROUP_CONCAT(d.dimension, '|')
+                FROM node_dimensions d WHERE d.node_id = n.id) AS dims
+        FROM node_dimensions p
+        CROSS JOIN nodes n ON n.id = p.node_id
+        WHERE p.dimension = 'pending'
+          AND EXISTS (SELECT 1 FROM node_dimensions t
+                      WHERE t.node_id = p.node_id AND t.dimension = 'task')
+          AND n.meta_due = date('now')
+    """, label="tasks_due_today")
     return [dict(r) for r in rows]
 
 
 def tasks_overdue() -> list[dict]:
     rows = query("""
-        SELECT n.id, n.title,
-               json_extract(n.metadata, '$.due') AS due,
-               GROUP_CONCAT(nd.dimension, '|') AS dims
-        FROM nodes n
-        JOIN node_dimensions nd ON nd.node_id = n.id
-        WHERE n.id IN (SELECT node_id FROM node_dimensions WHERE dimension = 'task')
-          AND n.id IN (SELECT node_id FROM node_dimensions WHERE dimension = 'pending')
-          AND json_extract(n.metadata, '$.due') < date('now')
-          AND json_extract(n.metadata, '$.due') IS NOT NULL
-        GROUP BY n.id
-        ORDER BY due ASC
+        SELECT n.id, n.title, n.meta_due AS due,
+               (SELECT GROUP_CONCAT(d.dimension, '|')
+                FROM node_dimensions d WHERE d.node_id = n.id) AS dims
+        FROM node_dimensions p
+        CROSS JOIN nodes n ON n.id = p.node_id
+        WHERE p.dimension = 'pending'
+          AND EXISTS (SELECT 1 FROM node_dimensions t
+                      WHERE t.node_id = p.node_id AND t.dimension = 'task')
+          AND n.meta_due < date('now')
+        ORDER BY n.meta_due ASC
         LIMIT 5
-    """)
+    """, label="tasks_overdue")
     return [dict(r) for r in rows]
 
 
@@ -159,7 +471,7 @@ def meetings_today() -> list[dict]:
         FROM nodes n
         WHERE n.id IN (SELECT node_id FROM node_dimensions WHERE dimension = 'meeting')
           AND COALESCE(n.event_date, json_extract(n.metadata, '$.date')) = date('now')
-    """)
+    """, label="meetings_today")
     return [dict(r) for r in rows]
 
 
@@ -168,80 +480,298 @@ def pending_clippings_count() -> int:
         SELECT COUNT(*) FROM nodes
         WHERE id IN (SELECT node_id FROM node_dimensions WHERE dimension = 'clipping')
           AND id IN (SELECT node_id FROM node_dimensions WHERE dimension = 'pending')
-    """) or 0
+    """, label="pending_clippings_count") or 0
+
+
+def local_midnight_utc(days_ago: int = 0) -> str:
+    """UTC timestamp (as the app's toISOString() writes) of local midnight
+    `days_ago` days before today, for indexed [start, end) ranges."""
+    day = date.today() - timedelta(days=days_ago)
+    midnight = datetime(day.year, day.month, day.day).astimezone(timezone.utc)
+    return midnight.strftime("%Y-%m-%dT%H:%M:%S")
 
 
 def activity_today() -> int:
-    """Count nodes created or updated today."""
+    """Count nodes created or updated today (local time)."""
+    start, end = local_midnight_utc(0), local_midnight_utc(-1)
     return scalar("""
         SELECT COUNT(*) FROM nodes
-        WHERE date(created_at) = date('now')
-           OR date(updated_at) = date('now')
-    """) or 0
+        WHERE (created_at >= ? AND created_at < ?)
+           OR (updated_at >= ? AND updated_at < ?)
+    """, (start, end, start, end), label="activity_today") or 0
 
 
 def review_exists(title_prefix: str, since_days: int) -> bool:
-    """Check if a review node with a given title prefix was created recently."""
-    count = scalar("""
-        SELECT COUNT(*) FROM nodes
-        WHERE title LIKE ?
-          AND date(created_at) >= date('now', ? || ' days')
-    """, (title_prefix + "%", f"-{since_days}"))
-    return (count or 0) > 0
-
-
-def stale_person_cards(days: int = 90) -> list[dict]:
-    """Return person/org nodes not updated in >N days."""
-    rows = query("""
-        SELECT n.id, n.title,
-               json_extract(n.metadata, '$.last') AS last,
-               GROUP_CONCAT(nd.dimension, '|') AS dims
-        FROM nodes n
-        JOIN node_dimensions nd ON nd.node_id = n.id
-        WHERE n.id IN (
-            SELECT node_id FROM node_dimensions WHERE dimension = 'person'
+    """Check if a review node with a given title prefix (ASCII case-insensitive;
+    must contain REVIEW_TITLE_MARKER) was created recently."""
+    prefix = "".join(c.lower() if c.isascii() else c for c in title_prefix)
+    if REVIEW_TITLE_MARKER.lower() not in prefix:
+        raise ValueError(f"Not a review title prefix (needs {REVIEW_TITLE_MARKER!r}): {title_prefix!r}")
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    # The LIKE term must match idx_nodes_review_title_ci's WHERE clause verbatim.
+    return scalar("""
+        SELECT EXISTS (
+            SELECT 1 FROM nodes
+            WHERE title LIKE '%Review —%'
+              AND lower(title) >= ? AND lower(title) < ?
+              AND created_at >= ?
         )
-          AND n.id NOT IN (
-            SELECT node_id FROM node_dimensions WHERE dimension = 'archived'
-          )
-          AND (
-            json_extract(n.metadata, '$.last') < date('now', ? || ' days')
-            OR json_extract(n.metadata, '$.last') IS NULL
+    """, (prefix, upper, local_midnight_utc(since_days)), label="review_exists") == 1
+
+
+def refresh_last_interactions() -> int:
+    """Recompute person_last_interaction for ids the triggers marked dirty;
+    return how many. "Never" is stored as '' so it sorts first."""
+    def refresh(con: sqlite3.Connection) -> int:
+        con.execute("""
+            DELETE FROM person_last_interaction
+            WHERE node_id IN (SELECT node_id FROM person_last_interaction_dirty)
+        """)
+        con.execute("""
+            INSERT INTO person_last_interaction (node_id, last_date)
+            SELECT d.node_id, COALESCE((
+                SELECT MAX(day) FROM (
+                    SELECT substr(COALESCE(s.event_date, s.created_at), 1, 10) AS day
+                    FROM person_interactions_v i
+                    JOIN nodes s ON s.id = i.source_id
+                    WHERE i.person_id = d.node_id
+                      AND EXISTS (SELECT 1 FROM node_dimensions k
+                                  WHERE k.node_id = s.id
+                                    AND k.dimension IN ('meeting', 'clipping'))
+                    UNION ALL
+                    SELECT substr(meta_last, 1, 10) FROM nodes WHERE id = d.node_id
+                )
+            ), '')
+            FROM person_last_interaction_dirty d
+            WHERE EXISTS (SELECT 1 FROM node_dimensions p
+                          WHERE p.node_id = d.node_id AND p.dimension IN ('person', 'org'))
+        """)
+        return con.execute("DELETE FROM person_last_interaction_dirty").rowcount
+
+    started = time.perf_counter()
+    count, lock_wait = pkm5_db.write(PKM5_DB, refresh)
+    record_timing("query", "refresh_last_interactions", started, lock_wait, count)
+    return count
+
+
+def stale_person_cards(days: int = 90, limit: int = CARD_PROPOSAL_LIMIT) -> list[dict]:
+    """Return person/org nodes with no interaction in >N days and no open
+    card-update proposal, never-interacted first. limit <= 0 means no limit."""
+    rows = query("""
+        SELECT n.id, n.title, NULLIF(li.last_date, '') AS last,
+               (SELECT GROUP_CONCAT(d.dimension, '|')
+                FROM node_dimensions d WHERE d.node_id = n.id) AS dims
+        FROM person_last_interaction li
+        CROSS JOIN nodes n ON n.id = li.node_id
+        WHERE li.last_date < date('now', ? || ' days')
+          AND NOT EXISTS (SELECT 1 FROM node_dimensions a
+                          WHERE a.node_id = li.node_id AND a.dimension = 'archived')
+          AND ? || n.title NOT IN (
+            SELECT pn.title
+            FROM node_dimensions pp
+            CROSS JOIN nodes pn ON pn.id = pp.node_id
+            WHERE pp.dimension = 'proposal'
+              AND pn.title IS NOT NULL
+              AND EXISTS (SELECT 1 FROM node_dimensions q
+                          WHERE q.node_id = pp.node_id AND q.dimension = 'pending')
           )
-        GROUP BY n.id
-        ORDER BY last ASC NULLS FIRST
-        LIMIT 20
-    """, (f"-{days}",))
+        ORDER BY li.last_date ASC
+        LIMIT ?
+    """, (f"-{days}", PROPOSAL_TITLE_PREFIX, limit if limit > 0 else -1), label="stale_person_cards")
     return [dict(r) for r in rows]
 
 
-def proposal_already_exists(title: str) -> bool:
-    count = scalar("""
-        SELECT COUNT(*) FROM nodes
-        WHERE title = ?
-          AND id IN (SELECT node_id FROM node_dimensions WHERE dimension = 'proposal')
-          AND id IN (SELECT node_id FROM node_dimensions WHERE dimension = 'pending')
-    """, (title,))
-    return (count or 0) > 0
-
-
-def create_proposal_node(title: str, notes: str) -> None:
-    """Write a card-update proposal directly to PKM5 SQLite."""
-    with db() as con:
-        now = datetime.utcnow().isoformat()
-        cur = con.execute(
-            """INSERT INTO nodes (title, notes, metadata, created_at, updated_at, chunk_status)
-               VALUES (?, ?, '{}', ?, ?, 'not_chunked')""",
-            (title, notes, now, now),
-        )
-        node_id = cur.lastrowid
-        for dim in ("proposal", "pending", "admin"):
-            con.execute(
-                "INSERT INTO node_dimensions (node_id, dimension) VALUES (?, ?)",
-                (node_id, dim),
+def create_proposal_nodes(proposals: list[tuple[str, str]]) -> list[int]:
+    """Write card-update proposals (title, notes) directly to PKM5 SQLite.
+
+    All nodes and their dimension rows go in a single transaction.
+    """
+    now = datetime.utcnow().isoformat()
+
+    def insert(con: sqlite3.Connection) -> list[int]:
+        node_ids = []
+        for title, notes in proposals:
+            cur = con.execute(
+                """INSERT INTO nodes (title, notes, metadata, created_at, updated_at, chunk_status)
+                   VALUES (?, ?, '{}', ?, ?, 'not_chunked')""",
+                (title, notes, now, now),
             )
-        con.commit()
-    logger.info(f"  Created proposal node {node_id}: {title!r}")
+            node_ids.append(cur.lastrowid)
+        con.executemany(
+            "INSERT INTO node_dimensions (node_id, dimension) VALUES (?, ?)",
+            [(node_id, dim) for node_id in node_ids for dim in ("proposal", "pending", "admin")],
+        )
+        return node_ids
+
+    started = time.perf_counter()
+    node_ids, lock_wait = pkm5_db.write(PKM5_DB, insert)
+    record_timing("query", "create_proposal_nodes", started, lock_wait, len(node_ids))
+    for node_id, (title, _) in zip(node_ids, proposals):
+        logger.info(f"  Created proposal node {node_id}: {title!r}")
+    return node_ids
+
+
+# ---------------------------------------------------------------------------
+# Declarative rules
+# ---------------------------------------------------------------------------
+
+# Date fields a rule condition may test (SQL over nodes n), besides
+# "metadata.<key>", which is read with json_extract and guarded like the
+# generated columns.
+RULE_DATE_FIELDS = {
+    "due": "n.meta_due",
+    "last": "n.meta_last",
+    "event_date": "n.event_date",
+    "date": "COALESCE(n.event_date, CASE WHEN json_valid(n.metadata) THEN json_extract(n.metadata, '$.date') END)",
+    "created_at": "n.created_at",
+    "updated_at": "n.updated_at",
+}
+RULE_DATE_OPS = ("<", "<=", "=", ">=", ">")
+RULE_TEMPLATE_FIELDS = {"name": "", "count": 2, "s": "s", "first": "", "first_date": ""}
+
+
+def load_rules(path: Path) -> list[dict]:
+    """Load and validate heartbeat rules from a JSON file ([] if missing);
+    format in scripts/heartbeat_rules.example.json and heartbeat-setup.md."""
+    if not path.exists():
+        return []
+    rules: list[dict] = []
+    for i, raw in enumerate(json.loads(path.read_text())["rules"]):
+        name = raw.get("name") or f"rule-{i + 1}"
+        dimensions = list(raw.get("dimensions") or [])
+        if not dimensions:
+            raise ValueError(f"Rule {name!r}: at least one dimension is required")
+        unknown = set(raw.get("ticks") or []) - set(MODES)
+        if not raw.get("ticks") or unknown:
+            raise ValueError(f"Rule {name!r}: ticks must be modes ({', '.join(MODES)})")
+        condition = raw.get("date")
+        if condition is not None:
+            field = condition.get("field", "")
+            key = field.removeprefix("metadata.")
+            if field not in RULE_DATE_FIELDS and not (field != key and key.isidentifier()):
+                raise ValueError(
+                    f"Rule {name!r}: unknown date field {field!r} "
+                    f"(known: {', '.join(RULE_DATE_FIELDS)}, metadata.<key>)"
+                )
+            if condition.get("op") not in RULE_DATE_OPS:
+                raise ValueError(f"Rule {name!r}: date op must be one of {' '.join(RULE_DATE_OPS)}")
+            condition = {"field": field, "op": condition["op"], "days": int(condition.get("days", 0))}
+        if not raw.get("message"):
+            raise ValueError(f"Rule {name!r}: message is required")
+        for template in ("message", "subtitle"):
+            try:
+                raw.get(template, "").format_map(RULE_TEMPLATE_FIELDS)
+            except KeyError as e:
+                raise ValueError(f"Rule {name!r}: unknown placeholder {e} in {template}") from None
+        rules.append({
+            "name": name,
+            "ticks": list(raw["ticks"]),
+            "dimensions": dimensions,
+            "exclude": list(raw.get("exclude") or []),
+            "date": condition,
+            "min_count": int(raw.get("min_count", 1)),
+            "message": raw["message"],
+            "subtitle": raw.get("subtitle", ""),
+            "urgent": bool(raw.get("urgent", False)),
+            "cooldown_hours": raw.get("cooldown_hours"),
+        })
+    return rules
+
+
+def compile_rules(rules: list[dict]) -> tuple[str, dict]:
+    """Compile rules into one aggregate query: a count and first match per
+    rule over the nodes carrying any rule's first dimension."""
+    dims = list(dict.fromkeys(d for r in rules for d in r["dimensions"] + r["exclude"]))
+    if len(dims) > 62:
+        raise ValueError(f"Rules use {len(dims)} distinct dimensions; at most 62 fit the bitmask")
+    params: dict = {f"dim{j}": d for j, d in enumerate(dims)}
+    driving = list(dict.fromkeys(r["dimensions"][0] for r in rules))
+    params.update({f"drive{j}": d for j, d in enumerate(driving)})
+    bit = {d: 1 << j for j, d in enumerate(dims)}
+
+    # Each candidate's dimensions fold into one bitmask (a node has each
+    # dimension once, so SUM is a bitwise OR); rules become predicates on it.
+    aggregates = []
+    for i, rule in enumerate(rules):
+        required = sum(bit[d] for d in set(rule["dimensions"]))
+        terms = [f"f.mask & {required} = {required}"]
+        if rule["exclude"]:
+            terms.append(f"f.mask & {sum(bit[d] for d in set(rule['exclude']))} = 0")
+        key = "char(31) || COALESCE(n.title, '')"
+        if rule["date"]:
+            field = rule["date"]["field"]
+            expr = RULE_DATE_FIELDS.get(field)
+            if expr is None:
+                expr = f"CASE WHEN json_valid(n.metadata) THEN json_extract(n.metadata, :path{i}) END"
+                params[f"path{i}"] = "$." + field.removeprefix("metadata.")
+            day = f"substr({expr}, 1, 10)"
+            terms.append(f"{day} {rule['date']['op']} date('now', :days{i})")
+            params[f"days{i}"] = f"{rule['date']['days']:+d} days"
+            key = f"COALESCE({day}, '') || {key}"
+        # Predicates sit directly in the aggregates (no derived column), so
+        # the sort key is only built for matching rows.
+        predicate = " AND ".join(terms)
+        aggregates.append(
+            f"COUNT(CASE WHEN {predicate} THEN 1 END) AS count{i}, "
+            f"MIN(CASE WHEN {predicate} THEN {key} END) AS first{i}"
+        )
+
+    sql = f"""
+        SELECT {', '.join(aggregates)}
+        FROM (
+            SELECT node_id,
+                   SUM(CASE dimension {' '.join(f'WHEN :dim{j} THEN {1 << j}' for j in range(len(dims)))}
+                       ELSE 0 END) AS mask
+            FROM node_dimensions
+            WHERE node_id IN (SELECT node_id FROM node_dimensions
+                              WHERE dimension IN ({', '.join(f':drive{j}' for j in range(len(driving)))}))
+            GROUP BY node_id
+        ) f
+        CROSS JOIN nodes n ON n.id = f.node_id
+    """
+    return sql, params
+
+
+def evaluate_rules(rules: list[dict]) -> list[dict]:
+    """Evaluate rules in one query; return {"rule", "count", "first",
+    "first_date"} per rule, in rule order."""
+    if not rules:
+        return []
+    sql, params = compile_rules(rules)
+    row = query(sql, params, label="evaluate_rules")[0]
+    results = []
+    for i, rule in enumerate(rules):
+        first_date, _, first = (row[f"first{i}"] or "\x1f").partition("\x1f")
+        results.append({"rule": rule, "count": row[f"count{i}"], "first": first, "first_date": first_date})
+    return results
+
+
+def run_rules(tick: str, dry_run: bool) -> int:
+    """Evaluate the rules from RULES_FILE that run on this tick and notify
+    for each one at or over its threshold. Returns the number that fired."""
+    rules = [r for r in load_rules(RULES_FILE) if tick in r["ticks"]]
+    if not rules:
+        return 0
+    fired = 0
+    for result in evaluate_rules(rules):
+        rule, count = result["rule"], result["count"]
+        if count < rule["min_count"]:
+            logger.info(f"Rule {rule['name']}: {count} match(es), below threshold {rule['min_count']}")
+            continue
+        if rule["cooldown_hours"] and not dry_run:
+            if not claim([f"rule:{rule['name']}"], ttl_hours=float(rule["cooldown_hours"])):
+                logger.info(f"Rule {rule['name']}: fired within the last {rule['cooldown_hours']}h")
+                continue
+        fields = {
+            "name": rule["name"], "count": count, "s": "s" if count != 1 else "",
+            "first": result["first"], "first_date": result["first_date"],
+        }
+        message = rule["message"].format_map(fields)
+        logger.info(f"Rule {rule['name']}: {message}")
+        if not dry_run:
+            notify(message, subtitle=rule["subtitle"].format_map(fields), urgent=rule["urgent"])
+        fired += 1
+    return fired
 
 
 # ---------------------------------------------------------------------------
@@ -303,33 +833,20 @@ def mode_evening(dry_run: bool) -> int:
 
 def mode_overdue(dry_run: bool) -> int:
     logger.info("Mode: overdue")
-    tasks = tasks_overdue()
+    tasks = cached_query("overdue_cache", tasks_overdue)
 
     if not tasks:
         logger.info("OK: no overdue tasks")
         return 0
 
     # Rate limit: don't re-notify the same task within 4 hours
-    state = load_state()
-    notified = state.get("notified_tasks", {})
-    now = datetime.now()
-
-    to_notify = []
-    for t in tasks:
-        key = str(t["id"])
-        last = notified.get(key)
-        if last and now - datetime.fromisoformat(last) < timedelta(hours=4):
-            continue
-        to_notify.append(t)
-        notified[key] = now.isoformat()
+    claimed = claim([f"notified_task:{t['id']}" for t in tasks], ttl_hours=4)
+    to_notify = [t for t in tasks if f"notified_task:{t['id']}" in claimed]
 
     if not to_notify:
         logger.info("OK: already notified recently")
         return 0
 
-    state["notified_tasks"] = notified
-    save_state(state)
-
     first = to_notify[0]
     extra = f" (+{len(to_notify) - 1} more)" if len(to_notify) > 1 else ""
     message = f"Overdue: {first['title']}{extra}"
@@ -386,40 +903,48 @@ def mode_quarterly(dry_run: bool) -> int:
     return 0
 
 
-def mode_card_proposals(dry_run: bool) -> int:
+def mode_card_proposals(dry_run: bool, limit: int = CARD_PROPOSAL_LIMIT) -> int:
     logger.info("Mode: card-proposals")
-    stale = stale_person_cards(days=90)
+    if dry_run:
+        logger.info("  [dry-run] using last-interaction aggregate as of the last refresh")
+    else:
+        refreshed = refresh_last_interactions()
+        logger.info(f"  Refreshed last interaction for {refreshed} changed node(s)")
+    stale = stale_person_cards(days=90, limit=limit)
 
     if not stale:
-        logger.info("OK: no stale person cards")
+        logger.info("OK: no stale person cards without an open proposal")
         return 0
 
-    created = 0
+    # The query only excludes proposals already in the database; cards that
+    # share a title would otherwise get identical proposals in this batch.
+    proposals = []
+    seen: set[str] = set()
     for card in stale:
         last = card["last"] or "never"
-        title = f"PROPOSAL: Update card for {card['title']}"
-        if proposal_already_exists(title):
-            logger.info(f"  Skipping (proposal exists): {card['title']}")
+        title = f"{PROPOSAL_TITLE_PREFIX}{card['title']}"
+        if title in seen:
+            logger.info(f"  Skipping (same title as another stale card): {card['title']}")
             continue
+        seen.add(title)
         notes = (
-            f"Person/org card not updated since: {last}\n\n"
+            f"No interaction with this person/org since: {last}\n\n"
             f"Node ID: {card['id']}\n\n"
             f"Actions:\n"
             f"- Review recent meetings/clippings mentioning this person\n"
-            f"- Update metadata.last with most recent interaction date\n"
+            f"- Link missing meetings/clippings, or set metadata.last for off-graph contact\n"
             f"- Update metadata.role if changed\n"
             f"- Increment metadata.cited if relevant\n"
         )
-        if not dry_run:
-            create_proposal_node(title, notes)
-        else:
-            logger.info(f"  [dry-run] would create proposal: {title!r}")
-        created += 1
+        proposals.append((title, notes))
 
-    if created == 0:
-        logger.info("OK: all proposals already exist")
-        return 0
+    if dry_run:
+        for title, _ in proposals:
+            logger.info(f"  [dry-run] would create proposal: {title!r}")
+    else:
+        create_proposal_nodes(proposals)
 
+    created = len(proposals)
     message = f"{created} stale card proposal{'s' if created != 1 else ''} created"
     logger.info(f"Card proposals: {message}")
     if not dry_run:
@@ -442,20 +967,87 @@ MODES = {
 }
 
 
+def run_dispatcher() -> int:
+    """--dispatch: wait out the coalescing window, then flush the outbox."""
+    time.sleep(max(NOTIFY_WINDOW_S, 0))
+    sent = flush_outbox("dispatcher", release_dispatcher=True)
+    logger.info(f"Dispatcher: sent {sent} notification(s) · {timing_summary()}")
+    return 0
+
+
 def main() -> int:
+    global SLOW_QUERY_MS, NOTIFY_WINDOW_S, NOTIFY_BACKEND, RULES_FILE
+
+    setup_started = time.perf_counter()
     parser = argparse.ArgumentParser(description="PKM5 Heartbeat scheduler")
-    parser.add_argument("--mode", required=True, choices=list(MODES))
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--mode", choices=list(MODES))
+    target.add_argument("--dispatch", action="store_true", help=argparse.SUPPRESS)
+    target.add_argument(
+        "--profile-startup", action="store_true",
+        help="Print import and setup time as JSON and exit (checked by heartbeat_bench.py)",
+    )
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument(
+        "--limit", type=int, default=CARD_PROPOSAL_LIMIT,
+        help=f"card-proposals: max cards per run, 0 = no limit (default: {CARD_PROPOSAL_LIMIT})",
+    )
+    parser.add_argument(
+        "--slow-ms", type=float, default=SLOW_QUERY_MS,
+        help=f"Log queries/notifications slower than this (default: {SLOW_QUERY_MS:.0f})",
+    )
+    parser.add_argument(
+        "--notify-window", type=float, default=NOTIFY_WINDOW_S,
+        help=f"Seconds to coalesce notifications, 0 = send inline (default: {NOTIFY_WINDOW_S:.0f})",
+    )
+    parser.add_argument(
+        "--notify-backend", default=NOTIFY_BACKEND,
+        help=f"Notification backend: {', '.join(BACKENDS)}; file takes a path, e.g. file:/tmp/n.jsonl; "
+             f"stdout is sent inline, without waiting for --notify-window "
+             f"(default: {NOTIFY_BACKEND}, env PKM_HEARTBEAT_NOTIFY)",
+    )
+    parser.add_argument(
+        "--rules", type=Path, default=RULES_FILE,
+        help=f"Declarative rules evaluated after each mode (default: {RULES_FILE}, env PKM_HEARTBEAT_RULES)",
+    )
     args = parser.parse_args()
+    RULES_FILE = args.rules.expanduser()
+    SLOW_QUERY_MS = args.slow_ms
+    NOTIFY_WINDOW_S = args.notify_window
+    NOTIFY_BACKEND = args.notify_backend
+    notification_backend(NOTIFY_BACKEND)  # fail fast on a bad spec
+    setup_logging()
+
+    if args.profile_startup:
+        print(json.dumps(pkm5_db.startup_profile("heartbeat", STARTED, setup_started)))
+        return 0
+    if args.dispatch:
+        return run_dispatcher()
+
+    kwargs = {"dry_run": args.dry_run}
+    if args.mode == "card-proposals":
+        kwargs["limit"] = args.limit
 
     logger.info(f"=== Heartbeat: {args.mode} {'(dry-run) ' if args.dry_run else ''}===")
+    started = time.perf_counter()
     try:
-        code = MODES[args.mode](dry_run=args.dry_run)
-        logger.info(f"=== Done (exit {code}) ===")
-        return code
+        code = MODES[args.mode](**kwargs)
     except Exception as e:
         logger.exception(f"Heartbeat failed: {e}")
-        return 1
+        code = 1
+    try:
+        run_rules(args.mode, args.dry_run)
+    except Exception as e:
+        logger.exception(f"Rules failed: {e}")
+        code = 1
+    try:
+        dispatch_notifications()
+    except Exception as e:
+        logger.exception(f"Notification dispatch failed: {e}")
+    total_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Timing: {args.mode} {total_ms:.0f} ms · {timing_summary()}")
+    logger.info(f"=== Done (exit {code}) ===")
+    return code
 
 
 if __name__ == "__main__":
@@ -0,0 +1,452 @@
+#!/opt/homebrew/bin/python3
+"""
+Heartbeat query benchmark — times scripts/heartbeat.py against synthetic
+PKM5 databases and checks query plans.
+
+For each requested size a synthetic pkm5.sqlite is generated (nodes with
+realistic node_dimensions fan-out, metadata JSON, edges and timestamps around
+today), migrated with the heartbeat scripts in scripts/migrate, and then:
+
+  - every heartbeat query function, the example rules and every mode (dry-run)
+    are timed
+  - every SQL statement they issue is run through EXPLAIN QUERY PLAN; any
+    full scan (a SCAN step other than SCAN CONSTANT ROW) fails the run
+
+The cold start of each launchd entry point (heartbeat.py, paperless/ingest.py
+with --profile-startup in a fresh interpreter) is timed too; the run fails
+when the median import + setup time goes over --startup-budget-ms or the
+median wall time (interpreter startup included) over
+--startup-wall-budget-ms. --startup-only runs just this check.
+
+Generated databases are cached in --workdir by size and seed, so repeated
+runs at 1M nodes only pay the build cost once.
+
+Usage:
+  python scripts/heartbeat_bench.py
+  python scripts/heartbeat_bench.py --sizes 10000,100000,1000000 --out bench.json
+  python scripts/heartbeat_bench.py --sizes 100000 --repeat 10
+  python scripts/heartbeat_bench.py --startup-only
+
+Exit codes:
+  0  OK
+  1  A hot query plan contains a full scan, or a cold start is over budget
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import heartbeat  # noqa: E402
+import pkm5_db  # noqa: E402
+
+EXAMPLE_RULES = SCRIPTS_DIR / "heartbeat_rules.example.json"
+MIGRATIONS = [
+    SCRIPTS_DIR / "migrate" / "add_heartbeat_indexes.sh",
+    SCRIPTS_DIR / "migrate" / "add_person_last_interaction.sh",
+]
+
+# (name, callable) — every heartbeat query helper, with typical arguments
+QUERIES = [
+    ("tasks_due_today", lambda: heartbeat.tasks_due_today()),
+    ("tasks_overdue", lambda: heartbeat.tasks_overdue()),
+    ("meetings_today", lambda: heartbeat.meetings_today()),
+    ("pending_clippings_count", lambda: heartbeat.pending_clippings_count()),
+    ("activity_today", lambda: heartbeat.activity_today()),
+    ("review_exists", lambda: heartbeat.review_exists("Weekly Review —", since_days=10)),
+    ("stale_person_cards", lambda: heartbeat.stale_person_cards(days=90)),
+    ("evaluate_rules", lambda: heartbeat.evaluate_rules(heartbeat.load_rules(EXAMPLE_RULES))),
+]
+
+# Node "types" and their share of the graph; status/domain dims are added on top
+TYPE_WEIGHTS = {
+    "clipping": 0.30,
+    "idea": 0.20,
+    "meeting": 0.15,
+    "task": 0.15,
+    "project": 0.05,
+    "person": 0.08,
+    "org": 0.02,
+    "commitment": 0.05,
+}
+DOMAINS = [
+    "admin", "EIT Water", "InnoStars", "HAC26", "BIO-RED", "KillerCatch",
+    "MyBoards", "ClaimMore", "InnoMap", "family", "health", "hobby",
+    "AI_development", "development",
+]
+
+# launchd entry points whose cold start (fresh interpreter, --profile-startup)
+# must stay within --startup-budget-ms (own imports + setup) and
+# --startup-wall-budget-ms (whole process, interpreter startup included)
+STARTUP_SCRIPTS = [
+    ("heartbeat", SCRIPTS_DIR / "heartbeat.py"),
+    ("ingest", SCRIPTS_DIR / "paperless" / "ingest.py"),
+]
+STARTUP_BUDGET_MS = 75.0
+STARTUP_WALL_BUDGET_MS = 200.0  # looser: spawn and interpreter startup are noisy
+
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)")
+SUBQUERY = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\S+)")
+
+
+# ---------------------------------------------------------------------------
+# Synthetic database
+# ---------------------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE nodes (
+  id INTEGER PRIMARY KEY,
+  title TEXT,
+  description TEXT,
+  notes TEXT,
+  link TEXT,
+  event_date TEXT,
+  created_at TEXT,
+  updated_at TEXT,
+  metadata TEXT,
+  chunk TEXT,
+  embedding BLOB,
+  embedding_updated_at TEXT,
+  embedding_text TEXT,
+  chunk_status TEXT DEFAULT 'not_chunked'
+);
+CREATE TABLE node_dimensions (
+  node_id INTEGER NOT NULL,
+  dimension TEXT NOT NULL,
+  PRIMARY KEY (node_id, dimension),
+  FOREIGN KEY (node_id) REFERENCES nodes(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE TABLE edges (
+  id INTEGER PRIMARY KEY,
+  from_node_id INTEGER NOT NULL,
+  to_node_id INTEGER NOT NULL,
+  source TEXT,
+  created_at TEXT,
+  context TEXT,
+  FOREIGN KEY (from_node_id) REFERENCES nodes(id) ON DELETE CASCADE,
+  FOREIGN KEY (to_node_id) REFERENCES nodes(id) ON DELETE CASCADE
+);
+CREATE INDEX idx_dim_by_node ON node_dimensions(node_id, dimension);
+CREATE INDEX idx_edges_from ON edges(from_node_id);
+CREATE INDEX idx_edges_to ON edges(to_node_id);
+"""
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _generate_rows(n: int, rng: random.Random):
+    """Yield (node_row, dimension_rows, edge_rows) for n synthetic nodes."""
+    types = list(TYPE_WEIGHTS)
+    weights = list(TYPE_WEIGHTS.values())
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    people: list[int] = []
+
+    for node_id in range(1, n + 1):
+        kind = rng.choices(types, weights)[0]
+        # Skew creation towards recent history (3 years), a few touched today
+        created = now - timedelta(days=min(rng.expovariate(1 / 200), 1095), seconds=rng.randint(0, 86399))
+        updated = created if rng.random() < 0.7 else now - timedelta(seconds=rng.randint(0, 30 * 86400))
+        dims = {kind, rng.choice(DOMAINS)}
+        metadata: dict = {}
+        event_date = None
+        title = f"{kind.title()} {node_id}"
+
+        if kind in ("task", "commitment"):
+            pending = rng.random() < 0.2
+            dims.add("pending" if pending else "done")
+            if rng.random() < 0.8:
+                metadata["due"] = (today + timedelta(days=rng.randint(-400, 60))).isoformat()
+        elif kind == "clipping":
+            if rng.random() < 0.05:
+                dims.add("pending")
+        elif kind == "meeting":
+            event_date = (today + timedelta(days=rng.randint(-700, 14))).isoformat()
+            metadata["date"] = event_date
+        elif kind in ("person", "org"):
+            dims.add("person")
+            people.append(node_id)
+            if rng.random() < 0.1:
+                dims.add("archived")
+            if rng.random() < 0.7:
+                metadata["last"] = (today - timedelta(days=rng.randint(0, 720))).isoformat()
+        elif kind == "idea" and rng.random() < 0.01:
+            review = rng.choice(["Daily", "Weekly", "Monthly", "Quarterly"])
+            title = f"{review} Review — {created.date().isoformat()}"
+
+        edges = []
+        if people and kind in ("meeting", "clipping"):
+            for _ in range(rng.randint(0, 3)):
+                edges.append((node_id, rng.choice(people), "bench", _iso(created)))
+        elif node_id > 1 and rng.random() < 0.5:
+            edges.append((node_id, rng.randint(1, node_id - 1), "bench", _iso(created)))
+
+        node = (
+            node_id, title, f"Synthetic {kind} node", "lorem ipsum " * rng.randint(1, 20),
+            event_date, _iso(created), _iso(updated), json.dumps(metadata),
+        )
+        yield node, [(node_id, d) for d in dims], edges
+
+
+def build_db(path: Path, n: int, seed: int) -> float:
+    """Create a synthetic PKM5 database of n nodes at path; return seconds taken."""
+    started = time.perf_counter()
+    tmp = path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+    con = sqlite3.connect(tmp)
+    con.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;" + SCHEMA)
+    rng = random.Random(seed)
+
+    nodes, dims, edges = [], [], []
+
+    def flush() -> None:
+        con.executemany(
+            "INSERT INTO nodes (id, title, description, notes, event_date, created_at, updated_at, metadata)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            nodes,
+        )
+        con.executemany("INSERT INTO node_dimensions (node_id, dimension) VALUES (?, ?)", dims)
+        con.executemany(
+            "INSERT INTO edges (from_node_id, to_node_id, source, created_at) VALUES (?, ?, ?, ?)",
+            edges,
+        )
+        nodes.clear()
+        dims.clear()
+        edges.clear()
+
+    for node, node_dims, node_edges in _generate_rows(n, rng):
+        nodes.append(node)
+        dims.extend(node_dims)
+        edges.extend(node_edges)
+        if len(nodes) >= 20000:
+            flush()
+    flush()
+    con.commit()
+    con.close()
+
+    for migration in MIGRATIONS:
+        subprocess.run(["bash", str(migration), str(tmp)], check=True, capture_output=True)
+    heartbeat.PKM5_DB = tmp
+    heartbeat.refresh_last_interactions()
+    pkm5_db.close_all()
+    tmp.rename(path)
+    return time.perf_counter() - started
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+class StatementRecorder:
+    """Wrap heartbeat.query/scalar to record every (sql, params) issued."""
+
+    def __init__(self) -> None:
+        self.statements: list[tuple[str, tuple]] = []
+        self._originals = (heartbeat.query, heartbeat.scalar)
+
+    def __enter__(self) -> "StatementRecorder":
+        orig_query, orig_scalar = self._originals
+
+        def query(sql: str, params: tuple = (), *, label: str):
+            self.statements.append((sql, params))
+            return orig_query(sql, params, label=label)
+
+        def scalar(sql: str, params: tuple = (), *, label: str):
+            self.statements.append((sql, params))
+            return orig_scalar(sql, params, label=label)
+
+        heartbeat.query, heartbeat.scalar = query, scalar
+        return self
+
+    def __exit__(self, *exc) -> None:
+        heartbeat.query, heartbeat.scalar = self._originals
+
+
+def explain(db_path: Path, statements: list[tuple[str, tuple]]) -> tuple[list[str], bool]:
+    """Return (plan lines, has_full_scan) for the given statements.
+
+    Scanning a subquery's own result (SCAN f after CO-ROUTINE f) is not a
+    table scan and does not count.
+    """
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    lines: list[str] = []
+    try:
+        for sql, params in statements:
+            for row in con.execute("EXPLAIN QUERY PLAN " + sql, params):
+                lines.append(row[3])
+    finally:
+        con.close()
+    subqueries = {m.group(1) for m in map(SUBQUERY.match, lines) if m}
+    scans = [m.group(1) for m in map(FULL_SCAN.match, lines) if m]
+    return lines, any(name not in subqueries for name in scans)
+
+
+def time_call(fn, repeat: int) -> dict:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    rows = len(result) if isinstance(result, list) else result
+    return {
+        "ms_median": round(statistics.median(samples), 3),
+        "ms_min": round(min(samples), 3),
+        "ms_max": round(max(samples), 3),
+        "result": rows,
+    }
+
+
+def bench_size(db_path: Path, state_dir: Path, repeat: int) -> tuple[dict, list[str]]:
+    # The app keeps pkm5.sqlite in WAL mode; measure under the same journal
+    with closing(sqlite3.connect(db_path)) as con:
+        con.execute("PRAGMA journal_mode=WAL")
+    heartbeat.PKM5_DB = db_path
+    failures: list[str] = []
+    queries: dict[str, dict] = {}
+
+    for name, fn in QUERIES:
+        with StatementRecorder() as rec:
+            fn()
+        plan, full_scan = explain(db_path, rec.statements)
+        entry = time_call(fn, repeat)
+        entry.update({"plan": plan, "full_scan": full_scan})
+        queries[name] = entry
+        if full_scan:
+            failures.append(f"{name}: full scan in plan")
+
+    modes: dict[str, dict] = {}
+    for name, handler in heartbeat.MODES.items():
+        def run(handler=handler) -> int:
+            # Fresh state each run so cached/rate-limited paths don't hide query cost
+            heartbeat.STATE_DB = state_dir / f"state-{time.perf_counter_ns()}.sqlite"
+            return handler(dry_run=True)
+        modes[name] = time_call(run, repeat)
+
+    return {"queries": queries, "modes": modes}, failures
+
+
+def bench_startup(repeat: int, budget_ms: float, wall_budget_ms: float) -> tuple[dict, list[str]]:
+    """Cold-start each entry point in a fresh interpreter (after one untimed
+    run to warm the .pyc cache) and check both medians against their budgets."""
+    failures: list[str] = []
+    startup: dict[str, dict] = {}
+    for name, script in STARTUP_SCRIPTS:
+        cmd = [sys.executable, str(script), "--profile-startup"]
+        subprocess.run(cmd, check=True, capture_output=True)
+        wall, own, profiles = [], [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            wall.append((time.perf_counter() - started) * 1000)
+            profile = json.loads(out.splitlines()[-1])
+            own.append(profile["imports_ms"] + profile["setup_ms"])
+            profiles.append(profile)
+        median = statistics.median(own)
+        typical = min(profiles, key=lambda p: abs(p["imports_ms"] + p["setup_ms"] - median))
+        startup[name] = {
+            "ms_median": round(median, 3),
+            "imports_ms": typical["imports_ms"],
+            "setup_ms": typical["setup_ms"],
+            "modules": typical["modules"],
+            "wall_ms_median": round(statistics.median(wall), 3),
+        }
+        if median > budget_ms:
+            failures.append(f"startup: {name} imports + setup {median:.0f} ms over {budget_ms:.0f} ms budget")
+        if startup[name]["wall_ms_median"] > wall_budget_ms:
+            failures.append(
+                f"startup: {name} wall {startup[name]['wall_ms_median']:.0f} ms "
+                f"over {wall_budget_ms:.0f} ms budget"
+            )
+    return startup, failures
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark heartbeat queries on synthetic PKM5 databases")
+    parser.add_argument("--sizes", default="10000", help="Comma-separated node counts (default: 10000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query/mode (default: 5)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--workdir", type=Path, default=Path(tempfile.gettempdir()) / "pkm5-heartbeat-bench",
+        help="Where generated databases are cached",
+    )
+    parser.add_argument("--out", type=Path, help="Write JSON results here (default: stdout)")
+    parser.add_argument(
+        "--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS,
+        help=f"Fail if an entry point's median import + setup ms exceeds this (default: {STARTUP_BUDGET_MS:.0f})",
+    )
+    parser.add_argument(
+        "--startup-wall-budget-ms", type=float, default=STARTUP_WALL_BUDGET_MS,
+        help=f"Fail if an entry point's median wall-clock cold start exceeds this "
+             f"(default: {STARTUP_WALL_BUDGET_MS:.0f})",
+    )
+    parser.add_argument(
+        "--startup-only", action="store_true",
+        help="Only run the cold-start check (no database is built or benchmarked)",
+    )
+    args = parser.parse_args()
+
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    heartbeat.notify = lambda *a, **k: None
+    heartbeat.logger.disabled = True
+
+    results = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "sizes": [],
+    }
+    print("Timing cold start", file=sys.stderr)
+    results["startup"], failures = bench_startup(
+        args.repeat, args.startup_budget_ms, args.startup_wall_budget_ms
+    )
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        for size in ([] if args.startup_only else (int(s) for s in args.sizes.split(","))):
+            db_path = args.workdir / f"pkm5-{size}-{args.seed}.sqlite"
+            build_s = None
+            if not db_path.exists():
+                print(f"Building {size} nodes → {db_path}", file=sys.stderr)
+                build_s = round(build_db(db_path, size, args.seed), 2)
+            print(f"Benchmarking {size} nodes", file=sys.stderr)
+            measured, size_failures = bench_size(db_path, Path(state_dir), args.repeat)
+            results["sizes"].append({"nodes": size, "build_s": build_s, **measured})
+            failures += [f"{size} nodes — {f}" for f in size_failures]
+
+    results["failures"] = failures
+    payload = json.dumps(results, indent=2)
+    if args.out:
+        args.out.write_text(payload)
+    else:
+        print(payload)
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
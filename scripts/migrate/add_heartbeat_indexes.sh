@@ -0,0 +1,81 @@
+#!/usr/bin/env bash
+# add_heartbeat_indexes.sh
+#
+# Add the access paths used by scripts/heartbeat.py:
+#   - nodes.meta_due / nodes.meta_last — indexed generated columns over
+#     metadata.due / metadata.last (NULL when metadata is not valid JSON,
+#     so app writes never fail on malformed metadata)
+#   - idx_dim_by_dimension — covering (dimension, node_id) index so each
+#     dimension filter is a range scan instead of a table scan
+#   - idx_nodes_created_at / idx_nodes_updated_at — half-open timestamp
+#     ranges for today's activity and review recency
+#   - idx_nodes_review_title_ci — small partial (lower(title), created_at)
+#     index over "… Review — …" nodes for case-insensitive review lookups
+#     (review_exists() in heartbeat.py repeats its WHERE clause verbatim);
+#     replaces the case-sensitive idx_nodes_review_title
+#
+# Idempotent: safe to re-run. Requires SQLite 3.31+ (generated columns).
+#
+# Usage: bash scripts/migrate/add_heartbeat_indexes.sh [path/to/pkm5.sqlite]
+
+set -euo pipefail
+
+DB_PATH=${1:-"$HOME/Library/Application Support/PKM5/db/pkm5.sqlite"}
+
+if [ ! -f "$DB_PATH" ]; then
+  echo "Error: Database file not found: $DB_PATH" >&2
+  exit 1
+fi
+
+if command -v brew >/dev/null 2>&1; then
+  SQLITE_BIN="$(brew --prefix sqlite 2>/dev/null)/bin/sqlite3"
+  [ -x "$SQLITE_BIN" ] || SQLITE_BIN="sqlite3"
+else
+  SQLITE_BIN="sqlite3"
+fi
+
+echo "Using sqlite: $($SQLITE_BIN --version)"
+
+# table_xinfo (not table_info) so hidden generated columns are listed
+has_col() {
+  local table=$1 col=$2
+  "$SQLITE_BIN" "$DB_PATH" -json \
+    "PRAGMA table_xinfo($table);" | \
+    grep -q "\"name\":\s*\"$col\""
+}
+
+if ! has_col nodes meta_due; then
+  echo "Adding generated column nodes.meta_due"
+  "$SQLITE_BIN" "$DB_PATH" <<'SQL'
+ALTER TABLE nodes ADD COLUMN meta_due TEXT
+  GENERATED ALWAYS AS (
+    CASE WHEN json_valid(metadata) THEN json_extract(metadata, '$.due') END
+  ) VIRTUAL;
+SQL
+fi
+
+if ! has_col nodes meta_last; then
+  echo "Adding generated column nodes.meta_last"
+  "$SQLITE_BIN" "$DB_PATH" <<'SQL'
+ALTER TABLE nodes ADD COLUMN meta_last TEXT
+  GENERATED ALWAYS AS (
+    CASE WHEN json_valid(metadata) THEN json_extract(metadata, '$.last') END
+  ) VIRTUAL;
+SQL
+fi
+
+echo "Ensuring heartbeat indexes exist..."
+"$SQLITE_BIN" "$DB_PATH" <<'SQL'
+CREATE INDEX IF NOT EXISTS idx_nodes_meta_due ON nodes(meta_due) WHERE meta_due IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_nodes_meta_last ON nodes(meta_last);
+CREATE INDEX IF NOT EXISTS idx_dim_by_dimension ON node_dimensions(dimension, node_id);
+CREATE INDEX IF NOT EXISTS idx_nodes_created_at ON nodes(created_at);
+CREATE INDEX IF NOT EXISTS idx_nodes_updated_at ON nodes(updated_at DESC);
+DROP INDEX IF EXISTS idx_nodes_review_title;
+CREATE INDEX IF NOT EXISTS idx_nodes_review_title_ci ON nodes(lower(title), created_at)
+  WHERE title LIKE '%Review —%';
+ANALYZE nodes;
+ANALYZE node_dimensions;
+SQL
+
+echo "Done."
@@ -0,0 +1,138 @@
+#!/usr/bin/env bash
+# add_person_last_interaction.sh
+#
+# Maintain a "last interaction" date per person/org node, derived from the
+# most recent meeting or clipping connected to it via edges
+# (COALESCE(event_date, created_at)), or metadata.last if that is later.
+#
+#   person_last_interaction        — node_id → last_date ('' = never),
+#                                    indexed on last_date for staleness scans
+#   person_last_interaction_dirty  — node ids whose value may have changed
+#   person_interactions_v          — edges seen from both endpoints
+#
+# Triggers on edges, node_dimensions and nodes only mark affected ids dirty
+# (cheap inside app writes); scripts/heartbeat.py recomputes the dirty ids
+# (refresh_last_interactions) before each staleness check. Running this
+# script marks every person/org dirty, so the first refresh is a full build.
+#
+# Idempotent: safe to re-run. Requires add_heartbeat_indexes.sh (meta_last).
+#
+# Usage: bash scripts/migrate/add_person_last_interaction.sh [path/to/pkm5.sqlite]
+
+set -euo pipefail
+
+DB_PATH=${1:-"$HOME/Library/Application Support/PKM5/db/pkm5.sqlite"}
+
+if [ ! -f "$DB_PATH" ]; then
+  echo "Error: Database file not found: $DB_PATH" >&2
+  exit 1
+fi
+
+if command -v brew >/dev/null 2>&1; then
+  SQLITE_BIN="$(brew --prefix sqlite 2>/dev/null)/bin/sqlite3"
+  [ -x "$SQLITE_BIN" ] || SQLITE_BIN="sqlite3"
+else
+  SQLITE_BIN="sqlite3"
+fi
+
+echo "Using sqlite: $($SQLITE_BIN --version)"
+
+# table_xinfo (not table_info) so hidden generated columns are listed
+has_col() {
+  local table=$1 col=$2
+  "$SQLITE_BIN" "$DB_PATH" -json \
+    "PRAGMA table_xinfo($table);" | \
+    grep -q "\"name\":\s*\"$col\""
+}
+
+# trg_pli_nodes_au reads NEW.meta_last; without the column every app update
+# of nodes would fail to prepare.
+if ! has_col nodes meta_last; then
+  echo "Error: nodes.meta_last missing — run scripts/migrate/add_heartbeat_indexes.sh first" >&2
+  exit 1
+fi
+
+echo "Ensuring person_last_interaction aggregate and triggers exist..."
+
+"$SQLITE_BIN" "$DB_PATH" <<'SQL'
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS person_last_interaction (
+  node_id INTEGER PRIMARY KEY,
+  last_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_person_last_interaction_date
+  ON person_last_interaction(last_date);
+
+CREATE TABLE IF NOT EXISTS person_last_interaction_dirty (
+  node_id INTEGER PRIMARY KEY
+);
+
+DROP VIEW IF EXISTS person_interactions_v;
+CREATE VIEW person_interactions_v AS
+SELECT from_node_id AS person_id, to_node_id AS source_id FROM edges
+UNION ALL
+SELECT to_node_id AS person_id, from_node_id AS source_id FROM edges;
+
+DROP TRIGGER IF EXISTS trg_pli_edges_ai;
+CREATE TRIGGER trg_pli_edges_ai AFTER INSERT ON edges BEGIN
+  INSERT OR IGNORE INTO person_last_interaction_dirty (node_id)
+  VALUES (NEW.from_node_id), (NEW.to_node_id);
+END;
+
+DROP TRIGGER IF EXISTS trg_pli_edges_ad;
+CREATE TRIGGER trg_pli_edges_ad AFTER DELETE ON edges BEGIN
+  INSERT OR IGNORE INTO person_last_interaction_dirty (node_id)
+  VALUES (OLD.from_node_id), (OLD.to_node_id);
+END;
+
+DROP TRIGGER IF EXISTS trg_pli_edges_au;
+CREATE TRIGGER trg_pli_edges_au AFTER UPDATE OF from_node_id, to_node_id ON edges BEGIN
+  INSERT OR IGNORE INTO person_last_interaction_dirty (node_id)
+  VALUES (OLD.from_node_id), (OLD.to_node_id), (NEW.from_node_id), (NEW.to_node_id);
+END;
+
+DROP TRIGGER IF EXISTS trg_pli_dims_ai;
+CREATE TRIGGER trg_pli_dims_ai AFTER INSERT ON node_dimensions
+WHEN NEW.dimension IN ('meeting', 'clipping', 'person', 'org') BEGIN
+  INSERT OR IGNORE INTO person_last_interaction_dirty (node_id)
+  SELECT NEW.node_id
+  UNION
+  SELECT person_id FROM person_interactions_v WHERE source_id = NEW.node_id;
+END;
+
+DROP TRIGGER IF EXISTS trg_pli_dims_ad;
+CREATE TRIGGER trg_pli_dims_ad AFTER DELETE ON node_dimensions
+WHEN OLD.dimension IN ('meeting', 'clipping', 'person', 'org') BEGIN
+  INSERT OR IGNORE INTO person_last_interaction_dirty (node_id)
+  SELECT OLD.node_id
+  UNION
+  SELECT person_id FROM person_interactions_v WHERE source_id = OLD.node_id;
+END;
+
+DROP TRIGGER IF EXISTS trg_pli_nodes_au;
+CREATE TRIGGER trg_pli_nodes_au AFTER UPDATE OF event_date, created_at, metadata ON nodes
+WHEN NEW.event_date IS NOT OLD.event_date
+  OR NEW.created_at IS NOT OLD.created_at
+  OR NEW.meta_last IS NOT OLD.meta_last BEGIN
+  INSERT OR IGNORE INTO person_last_interaction_dirty (node_id)
+  SELECT NEW.id
+  UNION
+  SELECT person_id FROM person_interactions_v WHERE source_id = NEW.id;
+END;
+
+DROP TRIGGER IF EXISTS trg_pli_nodes_ad;
+CREATE TRIGGER trg_pli_nodes_ad AFTER DELETE ON nodes BEGIN
+  INSERT OR IGNORE INTO person_last_interaction_dirty (node_id)
+  SELECT OLD.id
+  UNION
+  SELECT person_id FROM person_interactions_v WHERE source_id = OLD.id;
+END;
+
+INSERT OR IGNORE INTO person_last_interaction_dirty (node_id)
+SELECT node_id FROM node_dimensions WHERE dimension IN ('person', 'org');
+
+COMMIT;
+SQL
+
+echo "Done. Run scripts/heartbeat.py --mode card-proposals to build the aggregate."
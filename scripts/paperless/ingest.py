@@ -10,33 +10,46 @@ Modes:
 
 Usage:
     python scripts/paperless/ingest.py [--mode ingest|enrich|orphans|all] [--dry-run]
+    python scripts/paperless/ingest.py --profile-startup
 
 Requirements:
     pip install requests
     Paperless token at ~/.config/pkm/paperless_token
     PKM5 running at http://localhost:3000 (for ingest mode — node/edge creation)
     SSH access to maci (for tunnel to Paperless at maci:8000)
+
+PKM5 SQLite access goes through scripts/pkm5_db.py: reads use a pooled
+read-only connection, enrichment writes are retried while the app holds the
+write lock. SQLITE_DB_PATH overrides the database location.
 """
 
 from __future__ import annotations
 
-import argparse
-import json
-import os
-import signal
-import sqlite3
-import subprocess
-import sys
 import time
-from pathlib import Path
 
-import requests
+STARTED = time.perf_counter()  # --profile-startup measures imports from here
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import signal  # noqa: E402
+import sqlite3  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pkm5_db  # noqa: E402
+
+# requests (with urllib3, idna, charset detection, certifi) is by far the
+# heaviest import, so HTTP helpers import it on first use.
 
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
 
-PKM5_DB = Path.home() / "Library" / "Application Support" / "PKM5" / "db" / "pkm5.sqlite"
+PKM5_DB = pkm5_db.DB_PATH  # $SQLITE_DB_PATH or the app's default location
 PKM5_API = "http://localhost:3000"
 PAPERLESS_TUNNEL_PORT = 18000  # local port → maci:8000 via SSH
 PAPERLESS_BASE = f"http://localhost:{PAPERLESS_TUNNEL_PORT}"
@@ -73,6 +86,8 @@ def open_tunnel() -> subprocess.Popen:
 
 
 def paperless_get(path: str, token: str, params: dict | None = None) -> dict:
+    import requests
+
     r = requests.get(
         f"{PAPERLESS_BASE}{path}",
         headers={"Authorization": f"Token {token}"},
@@ -126,13 +141,9 @@ def infer_domain_from_tags(tag_ids: list[int], tag_map: dict[int, str]) -> str |
 
 
 # ---------------------------------------------------------------------------
-# PKM5 SQLite helpers (reads)
+# PKM5 SQLite helpers (reads — pooled read-only connection from pkm5_db)
 # ---------------------------------------------------------------------------
 
-def pkm5_db() -> sqlite3.Connection:
-    return sqlite3.connect(PKM5_DB)
-
-
 def get_linked_paperless_ids(db: sqlite3.Connection) -> dict[int, int]:
     """Return {paperless_id: node_id} for all PKM5 nodes that reference Paperless."""
     cur = db.execute("""
@@ -212,6 +223,8 @@ def get_nodes_needing_enrichment(db: sqlite3.Connection) -> list[dict]:
 # ---------------------------------------------------------------------------
 
 def pkm5_api_available() -> bool:
+    import requests
+
     try:
         r = requests.get(f"{PKM5_API}/api/dimensions", timeout=5)
         return r.status_code < 500
@@ -229,6 +242,8 @@ def create_pkm5_node(
     if dry_run:
         print(f"  [dry-run] would create node: {title!r} dims={dimensions}")
         return None
+    import requests
+
     payload = {
         "title": title,
         "dimensions": dimensions,
@@ -247,6 +262,8 @@ def create_pkm5_edge(from_id: int, to_id: int, relationship: str, dry_run: bool)
     if dry_run:
         print(f"  [dry-run] would create edge {from_id} → {to_id} ({relationship!r})")
         return
+    import requests
+
     payload = {"from_node_id": from_id, "to_node_id": to_id, "relationship": relationship}
     r = requests.post(f"{PKM5_API}/api/edges", json=payload, timeout=15)
     r.raise_for_status()
@@ -254,10 +271,10 @@ def create_pkm5_edge(from_id: int, to_id: int, relationship: str, dry_run: bool)
 
 
 # ---------------------------------------------------------------------------
-# Enrichment (direct SQLite write — same as enrich_from_paperless.py)
+# Enrichment (direct SQLite write via pkm5_db.write — same as enrich_from_paperless.py)
 # ---------------------------------------------------------------------------
 
-def enrich_node(db: sqlite3.Connection, node: dict, token: str, dry_run: bool, force: bool) -> bool:
+def enrich_node(node: dict, token: str, dry_run: bool, force: bool) -> bool:
     if not force and ENRICHED_MARKER in node["notes"]:
         return False  # already enriched
 
@@ -284,11 +301,10 @@ def enrich_node(db: sqlite3.Connection, node: dict, token: str, dry_run: bool, f
     if dry_run:
         print(f"  [dry-run] would enrich node {node['id']} ({len(new_notes)} chars total)")
     else:
-        db.execute(
+        pkm5_db.write(PKM5_DB, lambda con: con.execute(
             "UPDATE nodes SET notes = ?, chunk_status = 'not_chunked' WHERE id = ?",
             (new_notes, node["id"]),
-        )
-        db.commit()
+        ))
         print(f"  Enriched node {node['id']} ({len(new_notes)} chars)")
     return True
 
@@ -404,7 +420,7 @@ def mode_enrich(
     count = 0
     for node in nodes:
         print(f"Node {node['id']}: {node['title']}")
-        if enrich_node(db, node, token, dry_run, force):
+        if enrich_node(node, token, dry_run, force):
             count += 1
     return count
 
@@ -414,6 +430,7 @@ def mode_enrich(
 # ---------------------------------------------------------------------------
 
 def main() -> None:
+    setup_started = time.perf_counter()
     parser = argparse.ArgumentParser(description="Paperless-ngx → PKM5 ingestion pipeline")
     parser.add_argument(
         "--mode",
@@ -423,8 +440,15 @@ def main() -> None:
     )
     parser.add_argument("--dry-run", action="store_true", help="Print what would change, don't write")
     parser.add_argument("--force", action="store_true", help="Re-enrich even if already enriched")
+    parser.add_argument(
+        "--profile-startup", action="store_true",
+        help="Print import and setup time as JSON and exit (checked by heartbeat_bench.py)",
+    )
     args = parser.parse_args()
 
+    if args.profile_startup:
+        print(json.dumps(pkm5_db.startup_profile("ingest", STARTED, setup_started)))
+        return
     token = read_token()
     do_ingest = args.mode in ("ingest", "all")
     do_enrich = args.mode in ("enrich", "all")
@@ -446,11 +470,9 @@ def main() -> None:
     )
     time.sleep(2.0)
 
-    db = sqlite3.connect(PKM5_DB)
-
     def cleanup(sig=None, frame=None):
         tunnel.terminate()
-        db.close()
+        pkm5_db.close_all()
         print("\nTunnel closed.")
         sys.exit(0)
 
@@ -461,20 +483,21 @@ def main() -> None:
         tag_map = fetch_all_tags(token)
         correspondent_map = fetch_all_correspondents(token)
         docs = fetch_all_documents(token)
-        linked = get_linked_paperless_ids(db)
-        print(f"  {len(docs)} Paperless docs, {len(linked)} already linked to PKM5 nodes")
+        with pkm5_db.connection(PKM5_DB) as db:
+            linked = get_linked_paperless_ids(db)
+            print(f"  {len(docs)} Paperless docs, {len(linked)} already linked to PKM5 nodes")
 
-        ingested = 0
-        enriched = 0
+            ingested = 0
+            enriched = 0
 
-        if do_orphans:
-            mode_orphans(docs, linked, tag_map, correspondent_map)
+            if do_orphans:
+                mode_orphans(docs, linked, tag_map, correspondent_map)
 
-        if do_ingest:
-            ingested = mode_ingest(docs, linked, tag_map, correspondent_map, token, db, args.dry_run)
+            if do_ingest:
+                ingested = mode_ingest(docs, linked, tag_map, correspondent_map, token, db, args.dry_run)
 
-        if do_enrich:
-            enriched = mode_enrich(db, token, args.dry_run, args.force)
+            if do_enrich:
+                enriched = mode_enrich(db, token, args.dry_run, args.force)
 
         # Summary
         print("\n" + "─" * 50)
@@ -491,7 +514,7 @@ def main() -> None:
 
     finally:
         tunnel.terminate()
-        db.close()
+        pkm5_db.close_all()
         print("Done.")
 
 
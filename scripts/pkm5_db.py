@@ -0,0 +1,194 @@
+"""
+Shared PKM5 SQLite access for the Python scripts (heartbeat.py,
+paperless/ingest.py).
+
+The Next.js app keeps the same database open in WAL mode with its own busy
+timeout (src/services/database/sqlite-client.ts), so scripts behave like a
+polite second client:
+
+  - read-only by default: connection() hands out mode=ro URI connections,
+    which can never write and never hold a lock that blocks the app's writer
+  - pooled: connections are reused per (path, mode) for the life of the
+    process, so sqlite3's prepared-statement cache (cached_statements) stays
+    warm instead of every query re-opening the file and re-parsing the schema
+  - busy_timeout on every connection, plus execute(), which retries with
+    backoff when SQLITE_BUSY/LOCKED still escapes and reports the wait
+  - write() runs one BEGIN IMMEDIATE transaction on a writable connection,
+    serialised within the process and retried as a whole while the app
+    holds the write lock
+
+Database path: $SQLITE_DB_PATH (same variable as the app) or the default
+location under ~/Library/Application Support/PKM5.
+
+Usage:
+  import pkm5_db
+
+  with pkm5_db.connection(pkm5_db.DB_PATH) as con:
+      rows = con.execute("SELECT ...").fetchall()
+
+  pkm5_db.write(pkm5_db.DB_PATH, lambda con: con.execute("UPDATE ..."))
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+DB_PATH = Path(os.environ.get(
+    "SQLITE_DB_PATH",
+    Path.home() / "Library" / "Application Support" / "PKM5" / "db" / "pkm5.sqlite",
+))
+
+BUSY_TIMEOUT_S = 10.0        # busy handler per connection, and execute()/write() retry deadline
+POOL_SIZE = 4                # idle connections kept per (path, mode, busy timeout)
+STATEMENT_CACHE_SIZE = 256   # prepared statements cached per connection
+
+logger = logging.getLogger(__name__)
+
+_pool: dict[tuple[str, bool, float], list[sqlite3.Connection]] = {}
+_pool_lock = threading.Lock()
+_write_lock = threading.Lock()
+_checked_wal: set[str] = set()
+
+
+def connect(path: Path, readonly: bool = True, busy_timeout: float = BUSY_TIMEOUT_S) -> sqlite3.Connection:
+    """Open a new connection with the script-side pragmas.
+
+    Autocommit (isolation_level=None): sqlite3 never opens an implicit
+    transaction, so a pooled reader holds no snapshot between statements and
+    writers control their transactions explicitly. busy_timeout=0 disables
+    the busy handler for callers that retry (and measure) lock waits
+    themselves via execute().
+    """
+    uri = Path(path).expanduser().resolve().as_uri() + ("?mode=ro" if readonly else "")
+    con = sqlite3.connect(
+        uri,
+        uri=True,
+        timeout=busy_timeout,
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,  # pooled; never used by two threads at once
+    )
+    con.row_factory = sqlite3.Row
+    if not readonly:
+        con.execute("PRAGMA foreign_keys = ON")
+        con.execute("PRAGMA synchronous = NORMAL")
+    if str(path) not in _checked_wal:
+        _checked_wal.add(str(path))
+        mode = con.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode != "wal":
+            logger.warning(f"{path} is in {mode} journal mode, not WAL: script reads will block app writes")
+    return con
+
+
+@contextmanager
+def connection(
+    path: Path, readonly: bool = True, busy_timeout: float = BUSY_TIMEOUT_S
+) -> Iterator[sqlite3.Connection]:
+    """Borrow a pooled connection; it is returned to the pool on exit.
+
+    Anything the caller left uncommitted is rolled back before reuse.
+    """
+    key = (str(path), readonly, busy_timeout)
+    with _pool_lock:
+        idle = _pool.setdefault(key, [])
+        con = idle.pop() if idle else None
+    if con is None:
+        con = connect(path, readonly, busy_timeout)
+    try:
+        yield con
+    finally:
+        if con.in_transaction:
+            con.execute("ROLLBACK")
+        with _pool_lock:
+            if len(idle) < POOL_SIZE:
+                idle.append(con)
+                con = None
+        if con is not None:
+            con.close()
+
+
+def close_all() -> None:
+    """Close every pooled connection (e.g. before moving a database file)."""
+    with _pool_lock:
+        for idle in _pool.values():
+            for con in idle:
+                con.close()
+        _pool.clear()
+
+
+def is_busy(error: sqlite3.OperationalError) -> bool:
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def execute(
+    con: sqlite3.Connection, sql: str, params: tuple | dict = (), timeout: float = BUSY_TIMEOUT_S
+) -> tuple[sqlite3.Cursor, float]:
+    """Execute sql, retrying with backoff while the database is locked.
+
+    Returns (cursor, seconds spent waiting on locks outside the busy handler).
+    """
+    started = attempt = time.perf_counter()
+    delay = 0.005
+    while True:
+        try:
+            return con.execute(sql, params), attempt - started
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or time.perf_counter() - started >= timeout:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            attempt = time.perf_counter()
+
+
+def write(
+    path: Path, fn: Callable[[sqlite3.Connection], object], busy_timeout: float = BUSY_TIMEOUT_S
+) -> tuple[object, float]:
+    """Run fn(con) in one BEGIN IMMEDIATE transaction and return
+    (fn's result, seconds spent waiting for the write lock).
+
+    The write lock is taken up front, so the transaction cannot fail half
+    way on an upgrade from a read lock. If SQLITE_BUSY still surfaces, the
+    whole transaction is rolled back and fn runs again (for up to
+    busy_timeout seconds, like execute()) — keep fn to database work. Writes from this process
+    are serialised.
+    """
+    started = time.perf_counter()
+    delay = 0.005
+    with _write_lock, connection(path, readonly=False, busy_timeout=busy_timeout) as con:
+        while True:
+            try:
+                con.execute("BEGIN IMMEDIATE")
+                lock_wait = time.perf_counter() - started
+                try:
+                    result = fn(con)
+                    con.execute("COMMIT")
+                except BaseException:
+                    if con.in_transaction:
+                        con.execute("ROLLBACK")
+                    raise
+                return result, lock_wait
+            except sqlite3.OperationalError as e:
+                if not is_busy(e) or time.perf_counter() - started >= busy_timeout:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+
+
+def startup_profile(script: str, started: float, setup_started: float) -> dict:
+    """The --profile-startup payload for an entry point (checked by
+    heartbeat_bench.py): milliseconds from started (taken before the script's
+    first import) to setup_started (the top of main()), and from there to now."""
+    return {
+        "script": script,
+        "imports_ms": round((setup_started - started) * 1000, 2),
+        "setup_ms": round((time.perf_counter() - setup_started) * 1000, 2),
+        "modules": len(sys.modules),
+    }